@@ -19,6 +19,9 @@ intersphinx_mapping = {
     'xlsxwriter': ('https://xlsxwriter.readthedocs.io', None),
     'pygsheets': ('https://pygsheets.readthedocs.io/en/stable', None),
 }
+# Reuse inventories cached by previous builds and never block long on a fetch
+intersphinx_cache_limit = -1
+intersphinx_timeout = 5
 napoleon_google_docstring = False
 napoleon_numpy_docstring = True
 html_static_path = ['_static']
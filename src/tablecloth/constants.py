@@ -2,8 +2,12 @@
 from __future__ import annotations
 
 import pickle
+import string
 from pathlib import Path
-from typing import Dict, List, Literal, TypedDict
+from typing import Dict, List, Literal, Optional, Tuple, TypedDict
+
+CompiledTemplate = Tuple[Tuple[str, Optional[str]], ...]
+"""String template pre-parsed into (literal text, field name or None) pairs."""
 
 
 class Table(TypedDict):
@@ -50,6 +54,19 @@ class CheckTemplate(TypedDict):
     """Whether to skip the checking of blank cells."""
 
 
+class CompiledCheckTemplate(TypedDict):
+    """Pre-parsed formula templates for checking column values."""
+
+    valid: CompiledTemplate
+    """Formula returning TRUE if valid."""
+    invalid: CompiledTemplate
+    """Formula returning TRUE if invalid."""
+    message: CompiledTemplate
+    """Message describing the check."""
+    ignore_blank: bool
+    """Whether to skip the checking of blank cells."""
+
+
 class Dropdown(TypedDict):
     """Column dropdown."""
 
@@ -226,6 +243,52 @@ Formula templates to check whether a value is in a range.
 """
 
 
+def compile_template(template: str) -> CompiledTemplate:
+    """
+    Parse a string template into (literal text, field name or None) pairs.
+
+    Raises
+    ------
+    ValueError
+        Template has a field that is not a plain keyword (e.g. `{0}` or `{x.y}`),
+        or has a conversion or format specification (e.g. `{x!r}` or `{x:>5}`).
+    """
+    parsed = []
+    for literal, field, format_spec, conversion in string.Formatter().parse(template):
+        if field is not None and (
+            not field.isidentifier() or format_spec or conversion
+        ):
+            raise ValueError(f'Unsupported template field: {field!r} in {template!r}')
+        parsed.append((literal, field))
+    return tuple(parsed)
+
+
+def _compile_check(template: CheckTemplate) -> CompiledCheckTemplate:
+    """Parse the formula and message templates of a check template."""
+    return {
+        'valid': compile_template(template['valid']),
+        'invalid': compile_template(template['invalid']),
+        'message': compile_template(template['message']),
+        'ignore_blank': template['ignore_blank'],
+    }
+
+
+COMPILED_TYPES: Dict[str, CompiledCheckTemplate] = {
+    key: _compile_check(value) for key, value in TYPES.items()
+}
+"""Pre-parsed :data:`TYPES`."""
+
+
+COMPILED_CONSTRAINTS: Dict[str, CompiledCheckTemplate] = {
+    key: _compile_check(value) for key, value in CONSTRAINTS.items()
+}
+"""Pre-parsed :data:`CONSTRAINTS`."""
+
+
+COMPILED_IN_RANGE: CompiledCheckTemplate = _compile_check(IN_RANGE)
+"""Pre-parsed :data:`IN_RANGE`."""
+
+
 FONT_WIDTHS: Dict[str, Dict[int, float]] = {
     path.stem: pickle.load(path.open('rb'))
     for path in sorted(Path(__file__).parent.joinpath('font_widths').glob('*.pkl'))
@@ -233,5 +296,11 @@ FONT_WIDTHS: Dict[str, Dict[int, float]] = {
 """Width (em) of each character in a font by font name and Unicode code point."""
 
 
+FONT_MEAN_WIDTHS: Dict[str, float] = {
+    font: sum(widths.values()) / len(widths) for font, widths in FONT_WIDTHS.items()
+}
+"""Mean width (em) of the characters in a font by font name."""
+
+
 FONT_FAMILIES: List[str] = [font for font in FONT_WIDTHS if '-' not in font]
 """Supported font families."""
@@ -1,17 +1,21 @@
 """Write Microsoft Excel templates."""
 from __future__ import annotations
 
+import functools
+import itertools
 import math
 from pathlib import Path
-from typing import Any, Dict, List, Literal, cast
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, cast
 
 try:
     import xlsxwriter
-    import xlsxwriter.format
-    import xlsxwriter.worksheet
 except ImportError:
     raise ImportError('Writing Excel templates requires `xlsxwriter`')
 
+if TYPE_CHECKING:
+    import xlsxwriter.format
+    import xlsxwriter.worksheet
+
 from . import constants, helpers
 from .layout import Layout
 
@@ -24,7 +28,38 @@ MAX_ROWS: int = 1048576
 MAX_NAME_LENGTH: int = 31
 """Maximum length of sheet name."""
 
+DEFAULT_COL_WIDTH: float = 8.43
+"""Default column width (in character units)."""
+
+# Width of the '0' character and of cell padding (in pixels) in the default font
+# assumed by :func:`calculate_minimum_cell_width` (Calibri, 11 point, 96 dpi)
+_DEFAULT_ZERO_PX: float = constants.FONT_WIDTHS['calibri'][ord('0')] * 11 / 72 * 96
+_DEFAULT_PAD_PX: int = round((_DEFAULT_ZERO_PX + 1) / 4) * 2 + 1
+
+
+def _get_font(family: str = 'calibri', bold: bool = False, italic: bool = False) -> str:
+    """
+    Get the name of a font in :data:`.constants.FONT_WIDTHS`.
 
+    Raises
+    ------
+    NotImplementedError
+        Font family is not supported.
+    """
+    font = family.lower()
+    if font not in constants.FONT_FAMILIES:
+        raise NotImplementedError(
+            f"Font family '{family}' is not supported. "
+            f'Use one of {constants.FONT_FAMILIES}'
+        )
+    if bold:
+        font = f'{font}-bold'
+    if italic:
+        font = f'{font}-italic'
+    return font
+
+
+@functools.lru_cache(maxsize=4096)
 def calculate_minimum_cell_width(
     string: str,
     family: str = 'calibri',
@@ -62,26 +97,15 @@ def calculate_minimum_cell_width(
     """
     # DPI arbitrary after conversion to character units, but included for clarity
     dpi = 96
-    # Assume default font is Calibri, 11 point, non-bold, non-italic
-    default_font = 'calibri'
-    default_size = 11
     # Load font widths
-    font = family.lower()
-    if font not in constants.FONT_FAMILIES:
-        raise NotImplementedError(
-            f"Font family '{family}' is not supported. "
-            f'Use one of {constants.FONT_FAMILIES}'
-        )
-    if bold:
-        font = f'{font}-bold'
-    if italic:
-        font = f'{font}-italic'
+    font = _get_font(family=family, bold=bold, italic=italic)
     widths = constants.FONT_WIDTHS[font]
     # Measure only the longest line in a multiline string
-    string = max(string.split('\n'), key=len)
+    if '\n' in string:
+        string = max(string.split('\n'), key=len)
     # Compute content width in pixels. Assume average width for missing glyphs
-    mean_em = sum(widths.values()) / len(widths)
-    em = sum(widths.get(ord(char), mean_em) for char in string)
+    mean_em = constants.FONT_MEAN_WIDTHS[font]
+    em = sum(map(widths.get, map(ord, string), itertools.repeat(mean_em)))
     content_px = round(em * size / 72 * dpi)
     # Compute padding relative to '0' character width
     # https://stackoverflow.com/a/61041831
@@ -89,17 +113,15 @@ def calculate_minimum_cell_width(
     pad_px = round((zero_px + 1) / 4) * 2 + 1
     px = content_px + pad_px
     # Convert to character units based on '0' character width in default font size
-    default_widths = constants.FONT_WIDTHS[default_font]
-    default_zero_px = default_widths[ord('0')] * default_size / 72 * dpi
-    default_pad_px = round((default_zero_px + 1) / 4) * 2 + 1
     default_zero_pad_px = zero_px + pad_px
     return (
         px / math.ceil(default_zero_pad_px)
         if px < default_zero_pad_px
-        else (px - default_pad_px) / math.ceil(default_zero_px)
+        else (px - _DEFAULT_PAD_PX) / math.ceil(_DEFAULT_ZERO_PX)
     )
 
 
+@functools.lru_cache(maxsize=8192)
 def calculate_column_width(header: str, wrap: bool = False, **kwargs: Any) -> float:
     """
     Calculate column width (in character units) from header.
@@ -118,10 +140,49 @@ def calculate_column_width(header: str, wrap: bool = False, **kwargs: Any) -> fl
     """
     if not wrap:
         header = header.replace('\n', '')
+    if len(header) <= _max_length_at_minimum_width(**kwargs):
+        return 9
     minimum = calculate_minimum_cell_width(header, **kwargs)
     return max(minimum + 1.5, 9)
 
 
+@functools.lru_cache(maxsize=None)
+def _max_length_at_minimum_width(**kwargs: Any) -> int:
+    """
+    Get the maximum length of a header sure to get the minimum column width.
+
+    Found by measuring ever longer repeats of the widest character in the font
+    (up to the maximum column width of 255 characters).
+    Returns zero if the font size is not positive.
+
+    Parameters
+    ----------
+    **kwargs
+        Additional keyword arguments for :func:`calculate_minimum_cell_width`.
+
+    Raises
+    ------
+    NotImplementedError
+        Font family is not supported.
+    """
+    font = _get_font(
+        family=kwargs.get('family', 'calibri'),
+        bold=kwargs.get('bold', False),
+        italic=kwargs.get('italic', False),
+    )
+    if kwargs.get('size', 11) <= 0:
+        return 0
+    widths = constants.FONT_WIDTHS[font]
+    widest = chr(max(widths, key=widths.__getitem__))
+    length = 0
+    while (
+        length < 255
+        and calculate_minimum_cell_width(widest * (length + 1), **kwargs) + 1.5 <= 9
+    ):
+        length += 1
+    return length
+
+
 def write_table(
     sheet: xlsxwriter.worksheet.Worksheet,
     header: List[str],
@@ -179,24 +240,36 @@ def write_table(
     # Freeze header
     if freeze_header:
         sheet.freeze_panes(1, 0)
-    # Resize columns and add header comments
+    # Add header comments (options are shared by reference across all comments)
+    if comment_header:
+        for i, note in enumerate(comment_header):
+            if note:
+                sheet.write_comment(0, i, note, format_comments)
+    # Resize columns
+    # Determine final cell format (same for all header cells)
     format = format_header.__dict__ if format_header else {}
+    font = {
+        'family': format.get('font_name', 'calibri'),
+        'wrap': format.get('text_wrap', False),
+        'size': format.get('font_size', 11),
+        'bold': format.get('bold', False),
+        'italic': format.get('italic', False),
+    }
+    widths: List[float] = []
     for i, content in enumerate(header):
         if column_widths:
             width = column_widths[i]
         if not column_widths or width is None:
-            # Determine final cell format
-            width = calculate_column_width(
-                header=content,
-                family=format.get('font_name', 'calibri'),
-                wrap=format.get('text_wrap', False),
-                size=format.get('font_size', 11),
-                bold=format.get('bold', False),
-                italic=format.get('italic', False),
-            )
-        sheet.set_column(i, i, width=width)
-        if comment_header and comment_header[i]:
-            sheet.write_comment(0, i, comment_header[i], format_comments)
+            width = calculate_column_width(header=content, **font)
+        widths.append(width)
+    # Set each run of contiguous columns with equal width at once
+    # (skipping runs already at the default width)
+    first = 0
+    for width, run in itertools.groupby(widths):
+        last = first + len(list(run)) - 1
+        if width != DEFAULT_COL_WIDTH:
+            sheet.set_column(first, last, width=width)
+        first = last + 1
 
 
 def write_enum(sheet: xlsxwriter.worksheet.Worksheet, values: list, col: int) -> None:
@@ -212,11 +285,22 @@ def write_enum(sheet: xlsxwriter.worksheet.Worksheet, values: list, col: int) ->
     col
         Column to write values to (zero-indexed).
     """
+    if not any(isinstance(value, str) for value in values):
+        sheet.write_column(0, col, values)
+        return
+    # Write strings as strings, lest they be interpreted as formulas or urls
+    write_string, write_number, write = (
+        sheet.write_string,
+        sheet.write_number,
+        sheet.write,
+    )
     for i, value in enumerate(values):
         if isinstance(value, str):
-            sheet.write_string(i, col, value)
+            write_string(i, col, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            write_number(i, col, value)
         else:
-            sheet.write(i, col, value)
+            write(i, col, value)
 
 
 def write_template(
@@ -306,18 +390,22 @@ def write_template(
         header_format = book.add_format(format_header)
 
     # ---- Write tables
+    comments = header_comments or {}
+    widths = column_widths or {}
+    sheets: Dict[str, xlsxwriter.worksheet.Worksheet] = {}
     for table_props in layout.tables:
         sheet: xlsxwriter.worksheet.Worksheet = book.add_worksheet(table_props['sheet'])
+        sheets[table_props['table']] = sheet
         write_table(
             sheet=sheet,
             header=table_props['columns'],
-            comment_header=(header_comments or {}).get(table_props['table']),
+            comment_header=comments.get(table_props['table']),
             format_header=header_format,
             format_comments=format_comments,
             freeze_header=freeze_header,
             header_height=header_height,
             hide_columns=hide_columns,
-            column_widths=(column_widths or {}).get(table_props['table']),
+            column_widths=widths.get(table_props['table']),
         )
 
     # ---- Write enums
@@ -328,101 +416,164 @@ def write_template(
             write_enum(sheet=sheet, values=enum_props['values'], col=enum_props['col'])
 
     # --- Add column checks
-    for resource in package['resources']:
-        table = resource['name']
-        sheet_name = layout.get_table(table)['sheet']
-        sheet = book.get_worksheet_by_name(sheet_name)
-        foreign_keys = resource['schema'].get('foreignKeys', [])
-
-        # For each column
-        for field in resource['schema']['fields']:
-            column = field['name']
-            cells = layout.get_column_range(table, column)
-            dtype = field.get('type', 'any')
-            constraints = cast(
-                constants.Constraints,
-                {
-                    key: value
-                    for key, value in field.get('constraints', {}).items()
+    if dropdowns or error_type or format_invalid:
+        for resource in package['resources']:
+            table = resource['name']
+            sheet = sheets[table]
+            foreign_keys = resource['schema'].get('foreignKeys', [])
+            # Foreign keys to enforce (beyond dropdowns)
+            checked_foreign_keys = foreign_keys if validate_foreign_keys else None
+            codes = layout.get_column_codes(table)
+            ranges = layout.get_column_ranges(table)
+
+            # Columns with identical checks share the same validation and
+            # conditional format, applied to all their cell ranges at once
+            groups: Dict[tuple, Dict[str, Any]] = {}
+
+            # For each column
+            for field in resource['schema']['fields']:
+                column = field['name']
+                code = codes[column]
+                cells = ranges[column]
+                dtype = field.get('type', 'any')
+                constraints = cast(constants.Constraints, field.get('constraints', {}))
+                if 'pattern' in constraints:
                     # No regex support in Excel
-                    if key not in ['pattern']
-                },
-            )
-
-            # Data validation
-            validation = None
-            # Dropdown
-            if dropdowns:
-                dropdown = layout.select_column_dropdown(
-                    table=table,
-                    column=column,
-                    dtype=dtype,
-                    constraints=constraints,
-                    foreign_keys=foreign_keys,
-                    indirect=False,
-                )
-                if dropdown:
-                    validation = {
-                        'validate': 'list',
-                        'value': dropdown['options'],
-                        'error_title': 'Invalid value',
-                        'error_message': 'Value must be in the dropdown list',
-                        'ignore_blank': True,
-                        'error_type': error_type or 'information',
-                        'show_error': (
-                            bool(error_type)
-                            and (
-                                dropdown['source'] != 'foreign_key'
-                                or validate_foreign_keys
-                            )
-                        ),
-                    }
-            if not validation and error_type:
-                # Get column checks
-                checks = layout.gather_column_checks(
-                    table,
-                    column,
-                    valid=True,
-                    dtype=dtype,
-                    constraints=constraints,
-                    foreign_keys=foreign_keys if validate_foreign_keys else None,
+                    constraints = cast(
+                        constants.Constraints,
+                        {
+                            key: value
+                            for key, value in constraints.items()
+                            if key != 'pattern'
+                        },
+                    )
+                simple_foreign_keys = tuple(
+                    helpers.reduce_foreign_keys(
+                        foreign_keys, table=table, column=column
+                    )
                 )
-                check = helpers.build_column_validation(checks)
-                if check:
-                    validation = {
-                        'validate': 'custom',
-                        'value': check['formula'],
-                        'error_title': 'Invalid value',
-                        'error_message': check['message'],
-                        'ignore_blank': check['ignore_blank'],
-                        'error_type': error_type,
-                        'show_error': bool(error_type),
-                    }
-            if validation:
-                sheet.data_validation(cells, validation)
-
-            # Conditional formatting
-            if format_invalid:
-                checks = layout.gather_column_checks(
-                    table,
-                    column,
-                    valid=False,
-                    dtype=dtype,
-                    constraints=constraints,
-                    foreign_keys=foreign_keys if validate_foreign_keys else None,
+                # Skip columns that cannot have any checks
+                if (
+                    dtype not in constants.TYPES
+                    and not constraints
+                    and not simple_foreign_keys
+                ):
+                    continue
+                # Formulas differ only by (relative) column code
+                group_key = (
+                    dtype,
+                    helpers.to_hashable(constraints),
+                    simple_foreign_keys,
                 )
-                if checks:
-                    formula = helpers.build_column_condition(
-                        checks=checks,
+                if group_key in groups:
+                    groups[group_key]['cells'].append(cells)
+                    continue
+
+                # Data validation
+                validation = None
+                # Dropdown
+                if dropdowns:
+                    dropdown = layout.select_column_dropdown(
+                        table=table,
+                        column=column,
+                        dtype=dtype,
+                        constraints=constraints,
+                        foreign_keys=foreign_keys,
+                        indirect=False,
+                    )
+                    if dropdown:
+                        validation = {
+                            'validate': 'list',
+                            'value': dropdown['options'],
+                            'error_title': 'Invalid value',
+                            'error_message': 'Value must be in the dropdown list',
+                            'ignore_blank': True,
+                            'error_type': error_type or 'information',
+                            'show_error': (
+                                bool(error_type)
+                                and (
+                                    dropdown['source'] != 'foreign_key'
+                                    or validate_foreign_keys
+                                )
+                            ),
+                        }
+                if not validation and error_type:
+                    # Get column checks
+                    checks = layout.gather_column_checks(
+                        table,
+                        column,
+                        valid=True,
+                        dtype=dtype,
+                        constraints=constraints,
+                        foreign_keys=checked_foreign_keys,
+                    )
+                    check = helpers.build_column_validation(checks)
+                    if check:
+                        validation = {
+                            'validate': 'custom',
+                            'value': check['formula'],
+                            'error_title': 'Invalid value',
+                            'error_message': check['message'],
+                            'ignore_blank': check['ignore_blank'],
+                            'error_type': error_type,
+                            'show_error': bool(error_type),
+                        }
+
+                # Conditional formatting
+                condition = None
+                if format_invalid:
+                    checks = layout.gather_column_checks(
+                        table,
+                        column,
                         valid=False,
-                        col=layout.get_column_code(table, column),
+                        dtype=dtype,
+                        constraints=constraints,
+                        foreign_keys=checked_foreign_keys,
                     )
-                    sheet.conditional_format(
-                        cells,
-                        options={
+                    if checks:
+                        formula = helpers.build_column_condition(
+                            checks=checks,
+                            valid=False,
+                            col=code,
+                        )
+                        condition = {
                             'type': 'formula',
                             'criteria': formula,
                             'format': invalid_format,
+                        }
+                groups[group_key] = {
+                    'cells': [cells],
+                    'validation': validation,
+                    'condition': condition,
+                }
+
+            # Apply each group of column checks.
+            # Dropdown lists do not depend on the column,
+            # so identical dropdowns are merged across groups
+            validations: Dict[Any, Dict[str, Any]] = {}
+            for group_key, group in groups.items():
+                validation = group['validation']
+                if validation:
+                    key = (
+                        ('list', helpers.to_hashable(validation))
+                        if validation['validate'] == 'list'
+                        else group_key
+                    )
+                    validations.setdefault(
+                        key, {'cells': [], 'validation': validation}
+                    )['cells'] += group['cells']
+            for x in validations.values():
+                sheet.data_validation(
+                    x['cells'][0],
+                    {**x['validation'], 'multi_range': ' '.join(x['cells'])},
+                )
+            for group in groups.values():
+                if group['condition']:
+                    sheet.conditional_format(
+                        group['cells'][0],
+                        options={
+                            **group['condition'],
+                            'multi_range': ' '.join(group['cells']),
                         },
                     )
     if path is None:
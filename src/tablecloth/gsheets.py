@@ -1,6 +1,8 @@
 """Write Google Sheets templates."""
 from __future__ import annotations
 
+import functools
+import itertools
 import math
 from contextlib import contextmanager
 from typing import Any, Dict, Iterator, List, Literal
@@ -23,19 +25,42 @@ DEFAULT_SHEET_NAME: str = 'Sheet1'
 
 
 @contextmanager
-def batched(client: pygsheets.client.Client) -> Iterator[pygsheets.client.Client]:
-    """Context manager for updating Google Sheets in batch mode."""
+def batched(
+    client: pygsheets.client.Client, max_requests: int = 5000
+) -> Iterator[pygsheets.client.Client]:
+    """
+    Context manager for updating Google Sheets in batch mode.
+
+    If the client is already in batch mode, requests are left to the enclosing
+    context, so that nested contexts send a single batch.
+
+    Parameters
+    ----------
+    client
+        Google Sheets client.
+    max_requests
+        Maximum number of requests sent to each spreadsheet per batch.
+    """
+    if client.sheet.batch_mode:
+        yield client
+        return
     client.set_batch_mode(True)
     try:
         yield client
     except Exception as e:
         raise e
     else:
-        client.run_batch()
+        batches = client.sheet.batched_requests
+        client.set_batch_mode(False)
+        for spreadsheet_id, requests in batches.items():
+            for start in range(0, len(requests), max_requests):
+                stop = start + max_requests
+                client.sheet.batch_update(spreadsheet_id, requests[start:stop])
     finally:
         client.set_batch_mode(False)
 
 
+@functools.lru_cache(maxsize=4096)
 def calculate_minimum_cell_width(
     string: str,
     family: str = 'arial',
@@ -80,16 +105,18 @@ def calculate_minimum_cell_width(
         font = f'{font}-italic'
     widths = constants.FONT_WIDTHS[font]
     # Measure only the longest line in a multiline string
-    string = max(string.split('\n'), key=len)
+    if '\n' in string:
+        string = max(string.split('\n'), key=len)
     # Compute content width in pixels. Assume average width for missing glyphs
-    mean_em = sum(widths.values()) / len(widths)
-    em = sum(widths.get(ord(char), mean_em) for char in string)
+    mean_em = constants.FONT_MEAN_WIDTHS[font]
+    em = sum(map(widths.get, map(ord, string), itertools.repeat(mean_em)))
     points = size * em
     inches = points / 72
     # Google Sheets applies 3-pixel padding on each side
     return inches * dpi + 2 * 3
 
 
+@functools.lru_cache(maxsize=8192)
 def calculate_column_width(header: str, **kwargs: Any) -> float:
     """
     Calculate column width (in pixels) from header.
@@ -117,6 +144,7 @@ def write_table(
     comment_header: List[str] | None = None,
     hide_columns: bool = False,
     column_widths: List[int | float | None] | None = None,
+    fetch_format: bool = True,
 ) -> None:
     """
     Write an empty table (with header) to a Google Sheets sheet.
@@ -143,14 +171,24 @@ def write_table(
         Default is the minimum width to fit the header plus 10 pixels padding,
         and no less than 70 pixels.
         See :func:`calculate_minimum_cell_width` as a starting point for customization.
+    fetch_format
+        Whether to load any existing text format of the header cells
+        to calculate column widths. Not needed for a new sheet.
     """
     ncols = len(header)
     header_range = pygsheets.DataRange((1, 1), (1, ncols), sheet)
-    if not column_widths:
+    header_text_format = (format_header or {}).get('textFormat', {})
+    # Existing text format is irrelevant if overridden by the header format
+    fetch_format = fetch_format and not all(
+        key in header_text_format
+        for key in ('fontFamily', 'fontSize', 'bold', 'italic')
+    )
+    if fetch_format and (not column_widths or None in column_widths):
         # Load any existing cell text format to calculate column widths
         header_range.fetch()
     with batched(sheet.client):
-        header_range.update_values([header])
+        # Write via sheet (DataRange.update_values fetches the range again after)
+        sheet.update_values(crange=header_range.range, values=[header])
         if format_header:
             header_range.apply_format(
                 cell=None,
@@ -162,22 +200,44 @@ def write_table(
         if freeze_header:
             sheet.frozen_rows = 1
         if comment_header:
-            for i, note in enumerate(comment_header, start=1):
-                if note:
-                    pygsheets.DataRange((1, i), (1, i), sheet).apply_format(
-                        cell=None, fields='note', cell_json={'note': note}
+            # Write each run of contiguous notes in a single request,
+            # leaving cells without a note untouched
+            first = 0
+            for has_note, group in itertools.groupby(comment_header, key=bool):
+                notes = list(group)
+                if has_note:
+                    sheet.client.sheet.batch_update(
+                        sheet.spreadsheet.id,
+                        {
+                            'updateCells': {
+                                'range': {
+                                    'sheetId': sheet.id,
+                                    'startRowIndex': 0,
+                                    'endRowIndex': 1,
+                                    'startColumnIndex': first,
+                                    'endColumnIndex': first + len(notes),
+                                },
+                                'rows': [{'values': [{'note': x} for x in notes]}],
+                                'fields': 'note',
+                            }
+                        },
                     )
-        if hide_columns:
+                first += len(notes)
+        if hide_columns and sheet.cols != ncols:
             sheet.resize(cols=ncols)
         # Resize columns
+        widths: List[int] = []
         for i, content in enumerate(header, start=1):
             if column_widths:
                 width = column_widths[i - 1]
             if not column_widths or width is None:
                 # Determine final cell format
-                format = header_range.cells[0][i - 1].text_format or {}
-                if format_header:
-                    format = {**format, **format_header.get('textFormat', {})}
+                format = (
+                    header_range.cells[0][i - 1].text_format or {}
+                    if fetch_format
+                    else {}
+                )
+                format = {**format, **header_text_format}
                 width = calculate_column_width(
                     content,
                     family=format.get('fontFamily', 'arial'),
@@ -185,7 +245,13 @@ def write_table(
                     bold=format.get('bold', False),
                     italic=format.get('italic', False),
                 )
-            sheet.adjust_column_width(i, i, pixel_size=math.ceil(width))
+            widths.append(math.ceil(width))
+        # Set each run of contiguous columns with equal width at once
+        first = 1
+        for pixel_size, run in itertools.groupby(widths):
+            last = first + len(list(run)) - 1
+            sheet.adjust_column_width(first, last, pixel_size=pixel_size)
+            first = last + 1
 
 
 def write_enum(sheet: pygsheets.Worksheet, values: list, col: int) -> None:
@@ -201,9 +267,10 @@ def write_enum(sheet: pygsheets.Worksheet, values: list, col: int) -> None:
     col
         Column to write values to (zero-indexed).
     """
-    nrows = len(values)
-    enum_range = pygsheets.DataRange((1, col + 1), (nrows, col + 1), sheet)
-    enum_range.update_values([[value] for value in values])
+    code = helpers.column_index_to_code(col)
+    sheet.update_values(
+        crange=f'{code}1:{code}{len(values)}', values=[values], majordim='COLUMNS'
+    )
 
 
 def reset_sheets(book: pygsheets.Spreadsheet) -> None:
@@ -318,137 +385,269 @@ def write_template(
         max_rows=None,
     )
 
-    # ---- Write tables
-    for table_props in layout.tables:
-        sheet: pygsheets.Worksheet = book.add_worksheet(table_props['sheet'])
-        write_table(
-            sheet=sheet,
-            header=table_props['columns'],
-            comment_header=(header_comments or {}).get(table_props['table']),
-            format_header=format_header,
-            header_height=header_height,
-            freeze_header=freeze_header,
-            hide_columns=hide_columns,
-            column_widths=(column_widths or {}).get(table_props['table']),
+    # ---- Add sheets
+    # (all at once, in one request, rather than one request per sheet)
+    write_enums = bool((dropdowns or error_type or format_invalid) and layout.enums)
+    # Size each sheet to fit its content up front
+    # (default is that of book.add_worksheet: 100 rows, 26 columns)
+    properties: List[dict] = [
+        {
+            'title': x['sheet'],
+            'gridProperties': {
+                'rowCount': 100,
+                'columnCount': (
+                    len(x['columns']) if hide_columns else max(len(x['columns']), 26)
+                ),
+            },
+        }
+        for x in layout.tables
+    ]
+    if write_enums:
+        properties.append(
+            {
+                'title': layout.enum_sheet,
+                'hidden': True,
+                'gridProperties': {
+                    'rowCount': max(100, *(len(x['values']) for x in layout.enums)),
+                    'columnCount': max(26, len(layout.enums)),
+                },
+            }
         )
+    new_sheets: List[pygsheets.Worksheet] = []
+    if properties:
+        book.client.sheet.batch_update(
+            book.id,
+            [{'addSheet': {'properties': x}} for x in properties],
+            fields='spreadsheetId',
+        )
+        # Refresh the workbook's list of sheets
+        book.fetch_properties()
+        new_sheets = [book.worksheet_by_title(x['title']) for x in properties]
 
-    # --- Write enums
-    if (dropdowns or error_type or format_invalid) and layout.enums:
-        sheet = book.add_worksheet(layout.enum_sheet)
-        sheet.hidden = True
-        for enum_props in layout.enums:
-            write_enum(sheet=sheet, values=enum_props['values'], col=enum_props['col'])
-
-    # --- Add column checks
+    # Send all sheet updates (but not values) in a single batch
     with batched(book.client):
-        for resource in package['resources']:
-            table = resource['name']
-            sheet_name = layout.get_table(table)['sheet']
-            sheet = book.worksheet_by_title(sheet_name)
-            foreign_keys = resource['schema'].get('foreignKeys', [])
-
-            # For each column
-            for field in resource['schema']['fields']:
-                column = field['name']
-                # HACK: Force pygsheets to accept one-sided unbounded range
-                code = layout.get_column_code(table, column)
-                cells = pygsheets.GridRange(start=code, end=code, worksheet=sheet)
-                cells.set_json({'startRowIndex': 1, **cells.to_json()})
-                dtype = field.get('type', 'any')
-                constraints = field.get('constraints', {})
-
-                # Data validation
-                validation = None
-                # Dropdown
-                if dropdowns:
-                    dropdown = layout.select_column_dropdown(
-                        table=table,
-                        column=column,
-                        dtype=dtype,
-                        constraints=constraints,
-                        foreign_keys=foreign_keys,
-                        indirect=False,
-                    )
-                    if dropdown:
-                        range_validation = dropdown['source'] in ('enum', 'foreign_key')
-                        validation = {
-                            'condition_type': (
-                                'ONE_OF_RANGE' if range_validation else 'ONE_OF_LIST'
-                            ),
-                            'condition_values': (
-                                [f"={dropdown['options']}"]
-                                if range_validation
-                                else dropdown['options']
-                            ),
-                            'strict': error_type == 'stop',
-                            'showCustomUi': True,
-                            'inputMessage': 'Value must be in the dropdown list',
-                        }
-                if not validation and error_type:
-                    # Get column checks
-                    checks = layout.gather_column_checks(
-                        table,
-                        column,
-                        valid=True,
-                        dtype=dtype,
-                        constraints=constraints,
-                        foreign_keys=foreign_keys if validate_foreign_keys else None,
-                        indirect=False,
+        # ---- Write tables
+        comments = header_comments or {}
+        widths = column_widths or {}
+        sheets: Dict[str, pygsheets.Worksheet] = {}
+        for table_props, sheet in zip(layout.tables, new_sheets):
+            sheets[table_props['table']] = sheet
+            write_table(
+                sheet=sheet,
+                header=table_props['columns'],
+                comment_header=comments.get(table_props['table']),
+                format_header=format_header,
+                header_height=header_height,
+                freeze_header=freeze_header,
+                hide_columns=hide_columns,
+                column_widths=widths.get(table_props['table']),
+                fetch_format=False,
+            )
+
+        # --- Write enums
+        if write_enums:
+            # Write all enums in a single request (rather than write_enum for each)
+            ranges, values = [], []
+            for enum_props in layout.enums:
+                code = helpers.column_index_to_code(enum_props['col'])
+                ranges.append(f"{code}1:{code}{len(enum_props['values'])}")
+                values.append([enum_props['values']])
+            # Parse values as if typed by the user, like Worksheet.update_values
+            new_sheets[-1].update_values_batch(
+                ranges, values, majordim='COLUMNS', parse=book.default_parse
+            )
+
+        # --- Add column checks
+        if dropdowns or error_type or format_invalid:
+            for resource in package['resources']:
+                table = resource['name']
+                sheet = sheets[table]
+                foreign_keys = resource['schema'].get('foreignKeys', [])
+                # Foreign keys to enforce (beyond dropdowns)
+                checked_foreign_keys = foreign_keys if validate_foreign_keys else None
+                codes = layout.get_column_codes(table)
+                indices = {
+                    column: i
+                    for i, column in enumerate(layout.get_table(table)['columns'])
+                }
+                # Data validations merged across runs of adjacent columns
+                validations: List[Dict[str, Any]] = []
+                # Conditional formats grouped by column signature
+                conditions: Dict[Any, Dict[str, Any]] = {}
+
+                # For each column
+                for field in resource['schema']['fields']:
+                    column = field['name']
+                    dtype = field.get('type', 'any')
+                    constraints = field.get('constraints', {})
+                    simple_foreign_keys = tuple(
+                        helpers.reduce_foreign_keys(
+                            foreign_keys, table=table, column=column
+                        )
                     )
-                    check = helpers.build_column_validation(checks)
-                    if check:
-                        validation = {
-                            'condition_type': 'CUSTOM_FORMULA',
-                            'condition_values': [f"={check['formula']}"],
-                            'strict': error_type == 'stop',
-                            'showCustomUi': False,
-                            'inputMessage': check['message'],
-                        }
-                if validation:
-                    sheet.set_data_validation(grange=cells, **validation)
-
-                # Conditional formatting
-                if format_invalid:
-                    checks = layout.gather_column_checks(
-                        table,
-                        column,
-                        valid=False,
-                        dtype=dtype,
-                        constraints=constraints,
-                        foreign_keys=foreign_keys if validate_foreign_keys else None,
-                        indirect=True,
+                    # Skip columns that cannot have any checks
+                    if (
+                        dtype not in constants.TYPES
+                        and not constraints
+                        and not simple_foreign_keys
+                    ):
+                        continue
+                    code = codes[column]
+                    # Column cells below the header (unbounded)
+                    cells_json = {
+                        'sheetId': sheet.id,
+                        'startRowIndex': 1,
+                        'startColumnIndex': indices[column],
+                        'endColumnIndex': indices[column] + 1,
+                    }
+
+                    # Data validation
+                    validation = None
+                    # Dropdown
+                    if dropdowns:
+                        dropdown = layout.select_column_dropdown(
+                            table=table,
+                            column=column,
+                            dtype=dtype,
+                            constraints=constraints,
+                            foreign_keys=foreign_keys,
+                            indirect=False,
+                        )
+                        if dropdown:
+                            range_validation = dropdown['source'] in (
+                                'enum',
+                                'foreign_key',
+                            )
+                            validation = {
+                                'condition_type': (
+                                    'ONE_OF_RANGE'
+                                    if range_validation
+                                    else 'ONE_OF_LIST'
+                                ),
+                                'condition_values': (
+                                    [f"={dropdown['options']}"]
+                                    if range_validation
+                                    else dropdown['options']
+                                ),
+                                'strict': error_type == 'stop',
+                                'showCustomUi': True,
+                                'inputMessage': 'Value must be in the dropdown list',
+                            }
+                    if not validation and error_type:
+                        # Get column checks
+                        checks = layout.gather_column_checks(
+                            table,
+                            column,
+                            valid=True,
+                            dtype=dtype,
+                            constraints=constraints,
+                            foreign_keys=checked_foreign_keys,
+                            indirect=False,
+                        )
+                        check = helpers.build_column_validation(checks)
+                        if check:
+                            validation = {
+                                'condition_type': 'CUSTOM_FORMULA',
+                                'condition_values': [f"={check['formula']}"],
+                                'strict': error_type == 'stop',
+                                'showCustomUi': False,
+                                'inputMessage': check['message'],
+                            }
+                    if validation:
+                        previous = validations[-1] if validations else None
+                        if (
+                            previous
+                            and previous['validation'] == validation
+                            and previous['cells']['endColumnIndex']
+                            == cells_json['startColumnIndex']
+                        ):
+                            previous['cells']['endColumnIndex'] += 1
+                        else:
+                            validations.append(
+                                {'cells': {**cells_json}, 'validation': validation}
+                            )
+
+                    # Conditional formatting
+                    # Formulas differ only by (relative) column code
+                    group_key = (
+                        dtype,
+                        helpers.to_hashable(constraints),
+                        simple_foreign_keys,
                     )
-                    if checks:
-                        formula = helpers.build_column_condition(
-                            checks=checks,
+                    if format_invalid and group_key in conditions:
+                        conditions[group_key]['ranges'].append(cells_json)
+                    elif format_invalid:
+                        checks = layout.gather_column_checks(
+                            table,
+                            column,
                             valid=False,
-                            col=layout.get_column_code(table, column),
-                        )
-                        sheet.add_conditional_formatting(
-                            # HACK: Force pygsheets to use grange
-                            start=None,
-                            end=None,
-                            grange=cells,
-                            format=format_invalid,
-                            condition_type='CUSTOM_FORMULA',
-                            condition_values=[f'={formula}'],
+                            dtype=dtype,
+                            constraints=constraints,
+                            foreign_keys=checked_foreign_keys,
+                            indirect=True,
                         )
+                        if checks:
+                            formula = helpers.build_column_condition(
+                                checks=checks,
+                                valid=False,
+                                col=code,
+                            )
+                            conditions[group_key] = {
+                                'ranges': [cells_json],
+                                'formula': formula,
+                            }
+
+                # Set each data validation (a single range per request)
+                for x in validations:
+                    sheet.set_data_validation(
+                        grange=pygsheets.GridRange(
+                            worksheet=sheet, propertiesjson=x['cells']
+                        ),
+                        **x['validation'],
+                    )
+
+                # Add one conditional format rule per group of columns.
+                # Relative references are resolved from the first range.
+                for condition in conditions.values():
+                    sheet.client.sheet.batch_update(
+                        sheet.spreadsheet.id,
+                        {
+                            'addConditionalFormatRule': {
+                                'rule': {
+                                    'ranges': condition['ranges'],
+                                    'booleanRule': {
+                                        'condition': {
+                                            'type': 'CUSTOM_FORMULA',
+                                            'values': [
+                                                {
+                                                    'userEnteredValue': (
+                                                        f"={condition['formula']}"
+                                                    )
+                                                }
+                                            ],
+                                        },
+                                        'format': format_invalid,
+                                    },
+                                },
+                                'index': 0,
+                            }
+                        },
+                    )
 
     # ---- Delete default sheet
     # if present, not used by package, and empty
+    resource_names = {resource['name'] for resource in package['resources']}
+    if (
+        not resource_names
+        or DEFAULT_SHEET_NAME in resource_names
+        or DEFAULT_SHEET_NAME == enum_sheet
+    ):
+        return
     try:
         sheet = book.worksheet_by_title(DEFAULT_SHEET_NAME)
     except pygsheets.exceptions.WorksheetNotFound:
         return
-    else:
-        resource_names = [resource['name'] for resource in package['resources']]
-        if (
-            resource_names
-            and DEFAULT_SHEET_NAME not in resource_names
-            and DEFAULT_SHEET_NAME != enum_sheet
-            and sheet.get_all_values(
-                include_tailing_empty_rows=False, include_tailing_empty=False
-            )
-            == [[]]
-        ):
-            book.del_worksheet(sheet)
+    if sheet.get_all_values(
+        include_tailing_empty_rows=False, include_tailing_empty=False
+    ) == [[]]:
+        book.del_worksheet(sheet)
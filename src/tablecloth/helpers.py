@@ -3,17 +3,34 @@ from __future__ import annotations
 
 import functools
 import re
-from typing import List, Literal, Tuple
+from typing import Any, List, Literal, Tuple
 
 from . import constants
 
 # ---- Functions ----
 
 
+_CAMEL_CASE_BOUNDARY = re.compile(r'(?<!^)(?=[A-Z])')
+
+
+@functools.lru_cache(maxsize=512)
 def camel_to_snake_case(x: str) -> str:
     """Convert camelCase (and CamelCase) to snake_case."""
-    pattern = re.compile(r'(?<!^)(?=[A-Z])')
-    return pattern.sub('_', x).lower()
+    return _CAMEL_CASE_BOUNDARY.sub('_', x).lower()
+
+
+def to_hashable(x: Any) -> Any:
+    """
+    Convert dictionaries and lists (recursively) to hashable tuples.
+
+    Dictionaries become tuples of (key, value) pairs sorted by key,
+    so that equal dictionaries convert to equal tuples regardless of key order.
+    """
+    if isinstance(x, dict):
+        return tuple(sorted((key, to_hashable(value)) for key, value in x.items()))
+    if isinstance(x, (list, tuple)):
+        return tuple(to_hashable(value) for value in x)
+    return x
 
 
 def to_list(x: str | list | None) -> list:
@@ -25,26 +42,39 @@ def to_list(x: str | list | None) -> list:
     return list(x)
 
 
+def _column_index_to_code(i: int) -> str:
+    """Convert a column index to a spreadsheet column code (by arithmetic)."""
+    letters = bytearray()
+    i = i + 1
+    while i:
+        i, remainder = divmod(i - 1, 26)
+        letters.append(ord('A') + remainder)
+    letters.reverse()
+    return letters.decode('ascii')
+
+
+_COLUMN_CODES: Tuple[str, ...] = tuple(
+    _column_index_to_code(i) for i in range(26 + 26 * 26)
+)
+"""Column codes of one or two letters (A – ZZ), by column index."""
+
+
 def column_index_to_code(i: int) -> str:
     """Convert a column index to a spreadsheet column code."""
     if i < 0:
         raise ValueError('Column index `i` is less than zero')
-    letters: List[str] = []
-    i = i + 1
-    while i:
-        i, remainder = divmod(i - 1, 26)
-        letters[:0] = constants.LETTERS[remainder]
-    return ''.join(letters)
+    if i < len(_COLUMN_CODES):
+        return _COLUMN_CODES[i]
+    return _column_index_to_code(i)
 
 
 def column_code_to_index(code: str) -> int:
     """Convert a spreadsheet column code to a column index (zero-based)."""
-
-    # https://gist.github.com/dbspringer/643254008e6784aa749e#file-col2num-py
-    def function(x: int, y: int) -> int:
-        return x * 26 + y
-
-    return functools.reduce(function, [ord(c) - ord('A') + 1 for c in code]) - 1
+    # Letters are digits 1 - 26 in base 26 (with no zero)
+    index = 0
+    for letter in code:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
 
 
 def row_index_to_code(i: int) -> int:
@@ -196,6 +226,26 @@ def escape_braces(x: str) -> str:
     return x.replace('{', '{{').replace('}', '}}')
 
 
+def render_template(template: constants.CompiledTemplate, **kwargs: Any) -> str:
+    """
+    Render a pre-parsed string template.
+
+    Equivalent to :meth:`str.format` on the original template, but without
+    re-parsing the template on every call.
+
+    Parameters
+    ----------
+    template
+        Template pre-parsed into (literal text, field name or None) pairs.
+    **kwargs
+        Field values.
+    """
+    return ''.join(
+        literal if field is None else f'{literal}{kwargs[field]}'
+        for literal, field in template
+    )
+
+
 def build_column_condition(
     checks: List[constants.Check], valid: bool, col: str, row: int = 2
 ) -> str | None:
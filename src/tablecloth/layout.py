@@ -9,7 +9,7 @@ from __future__ import annotations
 
 import re
 import warnings
-from typing import Any, List, Literal, Type, cast
+from typing import Any, Dict, List, Literal, Type, cast
 
 from . import constants, helpers
 
@@ -248,6 +248,14 @@ class Layout:
         index = x['columns'].index(column)
         return helpers.column_index_to_code(index)
 
+    def get_column_codes(self, table: str) -> Dict[str, str]:
+        """Get the codes of all columns of a table by column name."""
+        x = self.get_table(table)
+        return {
+            column: helpers.column_index_to_code(index)
+            for index, column in enumerate(x['columns'])
+        }
+
     def get_column_range(
         self,
         table: str,
@@ -288,6 +296,45 @@ class Layout:
             indirect=indirect,
         )
 
+    def get_column_ranges(
+        self,
+        table: str,
+        nrows: int | None = None,
+        absolute: bool = False,
+        fixed: bool = False,
+        indirect: bool = False,
+    ) -> Dict[str, str]:
+        """
+        Get the cell ranges of all columns of a table by column name.
+
+        Parameters
+        ----------
+        table
+            Table name.
+        nrows
+            Number of rows to include.
+            If None, includes all rows (to `self.max_rows` or unbounded if undefined).
+        absolute
+            Whether to refer to the range by sheet name (e.g. 'Sheet1'!A2:A).
+        fixed
+            Whether to use a fixed range (e.g. $A$2:$A).
+        indirect
+            Whether to wrap range in INDIRECT function.
+            See https://support.google.com/docs/answer/3093377.
+        """
+        x = self.get_table(table)
+        return {
+            column: helpers.column_to_range(
+                col=col,
+                row=1,
+                nrows=nrows or (self.max_rows - 1 if self.max_rows else None),
+                sheet=x['sheet'] if absolute else None,
+                fixed=fixed,
+                indirect=indirect,
+            )
+            for col, column in enumerate(x['columns'])
+        }
+
     def select_column_dropdown(
         self,
         table: str,
@@ -408,11 +455,11 @@ class Layout:
         checks = []
 
         # Field type
-        if dtype in constants.TYPES:
-            template = constants.TYPES[dtype]
+        if dtype in constants.COMPILED_TYPES:
+            template = constants.COMPILED_TYPES[dtype]
             check: constants.Check = {
-                'formula': template[f].format(**defaults),
-                'message': template['message'],
+                'formula': helpers.render_template(template[f], **defaults),
+                'message': helpers.render_template(template['message']),
                 'ignore_blank': template['ignore_blank'],
             }
             checks.append(check)
@@ -429,26 +476,32 @@ class Layout:
 
         # Field constraints (except enum)
         for key, value in clean_constraints.items():
-            if key not in constants.CONSTRAINTS:
+            if key not in constants.COMPILED_CONSTRAINTS:
                 continue
-            template = constants.CONSTRAINTS[key]
+            template = constants.COMPILED_CONSTRAINTS[key]
             check = {
-                'formula': template[f].format(**defaults, value=value),
-                'message': template['message'].format(value=value),
+                'formula': helpers.render_template(
+                    template[f], **defaults, value=value
+                ),
+                'message': helpers.render_template(template['message'], value=value),
                 'ignore_blank': template['ignore_blank'],
             }
             checks.append(check)
 
         # Range lookups
-        template = constants.IN_RANGE
+        template = constants.COMPILED_IN_RANGE
         # enum
         if 'enum' in clean_constraints:
             enum_range = self.get_enum_range(
                 values=clean_constraints['enum'], indirect=indirect
             )
             check = {
-                'formula': template[f].format(**defaults, range=enum_range),
-                'message': template['message'].format(range=enum_range),
+                'formula': helpers.render_template(
+                    template[f], **defaults, range=enum_range
+                ),
+                'message': helpers.render_template(
+                    template['message'], range=enum_range
+                ),
                 'ignore_blank': template['ignore_blank'],
             }
             checks.append(check)
@@ -465,8 +518,12 @@ class Layout:
                 indirect=indirect,
             )
             check = {
-                'formula': template[f].format(**defaults, range=column_range),
-                'message': template['message'].format(range=column_range),
+                'formula': helpers.render_template(
+                    template[f], **defaults, range=column_range
+                ),
+                'message': helpers.render_template(
+                    template['message'], range=column_range
+                ),
                 'ignore_blank': template['ignore_blank'],
             }
             checks.append(check)
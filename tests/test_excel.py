@@ -11,6 +11,7 @@ import pytest
 import xlsxwriter
 import yaml
 
+import tablecloth.constants
 import tablecloth.excel
 
 
@@ -95,3 +96,131 @@ def test_writes_template_to_file() -> None:
         path = Path(directory) / 'test.xlsx'
         tablecloth.excel.write_template(package, path=path)
         assert path.exists()
+
+
+def test_applies_identical_column_checks_to_multiple_ranges() -> None:
+    """It applies identical column checks once to the ranges of all columns."""
+    package = {
+        'resources': [
+            {
+                'name': 'table',
+                'schema': {
+                    'fields': [
+                        {
+                            'name': 'x',
+                            'type': 'integer',
+                            'constraints': {'minimum': 1, 'maximum': 9},
+                        },
+                        {'name': 'y', 'type': 'number'},
+                        # Same constraints in a different order
+                        {
+                            'name': 'z',
+                            'type': 'integer',
+                            'constraints': {'maximum': 9, 'minimum': 1},
+                        },
+                    ]
+                },
+            }
+        ]
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'test.xlsx'
+        tablecloth.excel.write_template(package, path=path, error_type='stop')
+        text = read_xlsx_as_string(path)
+    assert text.count('<dataValidation ') == 2
+    assert text.count('<conditionalFormatting ') == 2
+    assert 'sqref="A2:A1048576 C2:C1048576"' in text
+
+
+def test_writes_mixed_enum_values_by_type() -> None:
+    """It writes strings as strings and other values by their type."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'test.xlsx'
+        book = xlsxwriter.Workbook(path)
+        sheet = book.add_worksheet()
+        tablecloth.excel.write_enum(sheet, values=['=x', 1.5, True], col=0)
+        book.close()
+        text = read_xlsx_as_string(path)
+    assert '<f>' not in text
+    assert '<t>=x</t>' in text
+    assert '<c r="A2">\n<v>1.5</v>' in text
+    assert '<c r="A3" t="b">\n<v>1</v>' in text
+
+
+def test_skips_columns_at_default_width() -> None:
+    """It does not set the width of columns already at the default width."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'test.xlsx'
+        book = xlsxwriter.Workbook(path)
+        sheet = book.add_worksheet()
+        tablecloth.excel.write_table(
+            sheet, header=['x', 'y', 'z'], column_widths=[None, 8.43, 8.43]
+        )
+        book.close()
+        text = read_xlsx_as_string(path)
+    assert text.count('<col ') == 1
+    assert '<col min="1" max="1" ' in text
+
+
+def test_merges_identical_dropdowns_across_column_checks() -> None:
+    """It applies identical dropdowns once, even if other column checks differ."""
+    package = {
+        'resources': [
+            {
+                'name': 'table',
+                'schema': {
+                    'fields': [
+                        {'name': 'x', 'type': 'boolean'},
+                        {
+                            'name': 'y',
+                            'type': 'boolean',
+                            'constraints': {'required': True},
+                        },
+                    ]
+                },
+            }
+        ]
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'test.xlsx'
+        tablecloth.excel.write_template(package, path=path)
+        text = read_xlsx_as_string(path)
+    assert text.count('<dataValidation ') == 1
+    assert 'sqref="A2:A1048576 B2:B1048576"' in text
+    assert text.count('<conditionalFormatting ') == 2
+
+
+@pytest.mark.parametrize('family', ['calibri', 'arial', 'courier new'])
+@pytest.mark.parametrize('bold', [False, True])
+def test_skips_measuring_headers_sure_to_get_the_minimum_width(
+    family: str, bold: bool
+) -> None:
+    """It gets the minimum column width for short headers without measuring them."""
+    widths = tablecloth.constants.FONT_WIDTHS[f'{family}-bold' if bold else family]
+    widest = chr(max(widths, key=widths.__getitem__))
+    for length in range(1, 12):
+        header = widest * length
+        expected = max(
+            tablecloth.excel.calculate_minimum_cell_width(
+                header, family=family, bold=bold
+            )
+            + 1.5,
+            9,
+        )
+        actual = tablecloth.excel.calculate_column_width(
+            header, family=family, bold=bold
+        )
+        assert actual == expected
+
+
+@pytest.mark.parametrize('size', [0, -1, 1e-9])
+def test_calculates_column_width_for_degenerate_font_sizes(size: float) -> None:
+    """It returns the minimum column width for headers with no (or tiny) width."""
+    assert tablecloth.excel.calculate_column_width('x', size=size) == 9
+
+
+@pytest.mark.parametrize('header', ['', 'x', 'x' * 100])
+def test_refuses_to_calculate_column_width_for_unsupported_font(header: str) -> None:
+    """It raises an error for an unsupported font family, whatever the header."""
+    with pytest.raises(NotImplementedError):
+        tablecloth.excel.calculate_column_width(header, family='foo')
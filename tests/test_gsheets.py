@@ -1,8 +1,15 @@
 """Test cases for the gsheets module."""
+from __future__ import annotations
+
+import copy
+import json
 import os
+import urllib.parse
 from pathlib import Path
+from typing import Any, List, Tuple
 
 import dotenv
+import google.auth.credentials
 import pygsheets
 import pygsheets.exceptions
 import pytest
@@ -13,21 +20,92 @@ import tablecloth.gsheets
 dotenv.load_dotenv()
 
 
+client = None
 if os.getenv('GOOGLE_CLOUD_SERVICE_ACCOUNT_KEY'):
     try:
         client = pygsheets.authorize(
             service_account_env_var='GOOGLE_CLOUD_SERVICE_ACCOUNT_KEY'
         )
+        skip_reason = ''
     except Exception as e:
-        pytest.skip(
-            f'Google Cloud authorization failed: {e}',
-            allow_module_level=True,
-        )
+        skip_reason = f'Google Cloud authorization failed: {e}'
 else:
-    pytest.skip(
-        'GOOGLE_CLOUD_SERVICE_ACCOUNT_KEY environment variable is empty',
-        allow_module_level=True,
+    skip_reason = 'GOOGLE_CLOUD_SERVICE_ACCOUNT_KEY environment variable is empty'
+
+requires_client = pytest.mark.skipif(client is None, reason=skip_reason)
+
+
+class FakeServer:
+    """Fake Google Sheets API server that records all requests."""
+
+    def __init__(self) -> None:
+        self.spreadsheet: dict = {
+            'spreadsheetId': 'book',
+            'properties': {'title': 'book', 'defaultFormat': {}},
+            'sheets': [],
+        }
+        self.requests: List[dict] = []
+        self.add_sheet({'title': 'Sheet1'})
+
+    def add_sheet(self, properties: dict) -> dict:
+        """Add a sheet with default properties."""
+        n = len(self.spreadsheet['sheets'])
+        properties = {
+            'sheetId': n,
+            'index': n,
+            'sheetType': 'GRID',
+            'gridProperties': {'rowCount': 1000, 'columnCount': 26},
+            **copy.deepcopy(properties),
+        }
+        self.spreadsheet['sheets'].append({'properties': properties})
+        return properties
+
+    def execute(self, request: Any) -> dict:
+        """Record a request and return a minimal response."""
+        body = json.loads(request.body) if request.body else {}
+        self.requests.append({'uri': request.uri, 'body': body})
+        path = request.uri.split('?')[0]
+        if path.endswith(':batchUpdate') and '/values' not in path:
+            replies = [
+                {
+                    'addSheet': {
+                        'properties': self.add_sheet(x['addSheet']['properties'])
+                    }
+                }
+                if 'addSheet' in x
+                else {}
+                for x in body['requests']
+            ]
+            response = {'spreadsheetId': 'book', 'replies': replies}
+            if body.get('includeSpreadsheetInResponse'):
+                response['updatedSpreadsheet'] = copy.deepcopy(self.spreadsheet)
+            return response
+        if request.method == 'GET' and '/values' not in path:
+            return copy.deepcopy(self.spreadsheet)
+        return {}
+
+    def sheet_requests(self, kind: str) -> List[dict]:
+        """Get all sheet update requests of a kind (e.g. 'setDataValidation')."""
+        return [
+            x[kind]
+            for request in self.requests
+            if request['uri'].split('?')[0].endswith(':batchUpdate')
+            for x in request['body'].get('requests', [])
+            if isinstance(x, dict) and kind in x
+        ]
+
+
+def get_fake_book() -> Tuple[pygsheets.Spreadsheet, FakeServer]:
+    """Get a Google Sheets workbook connected to a fake server."""
+    server = FakeServer()
+    fake_client = pygsheets.client.Client(
+        google.auth.credentials.AnonymousCredentials()
     )
+    fake_client.sheet._execute_requests = server.execute
+    book = pygsheets.Spreadsheet(
+        fake_client, jsonsheet=copy.deepcopy(server.spreadsheet)
+    )
+    return book, server
 
 
 def get_book(name: str) -> pygsheets.Spreadsheet:
@@ -51,6 +129,7 @@ def get_book(name: str) -> pygsheets.Spreadsheet:
     return book
 
 
+@requires_client
 @pytest.mark.gsheets
 @pytest.mark.parametrize(
     'name, arguments',
@@ -72,3 +151,141 @@ def test_writes_template(name: str, arguments: dict) -> None:
     book = get_book(f'tablecloth-test-{name}')
     kwargs = {'header_comments': comments, **arguments}
     tablecloth.gsheets.write_template(package, book=book, **kwargs)
+
+
+def test_applies_identical_conditional_formats_to_multiple_ranges() -> None:
+    """It adds one conditional format rule, anchored to the first column range."""
+    package = {
+        'resources': [
+            {
+                'name': 'table',
+                'schema': {
+                    'fields': [
+                        {
+                            'name': 'x',
+                            'type': 'integer',
+                            'constraints': {'minimum': 1, 'maximum': 9},
+                        },
+                        {'name': 'y', 'type': 'number'},
+                        # Same constraints in a different order
+                        {
+                            'name': 'z',
+                            'type': 'integer',
+                            'constraints': {'maximum': 9, 'minimum': 1},
+                        },
+                    ]
+                },
+            }
+        ]
+    }
+    book, server = get_fake_book()
+    tablecloth.gsheets.write_template(
+        package, book=book, format_invalid={'backgroundColor': {'red': 1}}
+    )
+    rules = server.sheet_requests('addConditionalFormatRule')
+    assert len(rules) == 2
+    rule = next(x['rule'] for x in rules if len(x['rule']['ranges']) == 2)
+    sheet_id = book.worksheet_by_title('table').id
+    assert rule['ranges'] == [
+        {
+            'sheetId': sheet_id,
+            'startRowIndex': 1,
+            'startColumnIndex': col,
+            'endColumnIndex': col + 1,
+        }
+        for col in (0, 2)
+    ]
+    # Relative references are those of the first range (top-left cell A2)
+    formula = rule['booleanRule']['condition']['values'][0]['userEnteredValue']
+    assert 'A2' in formula and 'C2' not in formula
+
+
+def test_adds_all_sheets_in_one_request() -> None:
+    """It adds all sheets at once and keeps the workbook's sheets up to date."""
+    package = {
+        'resources': [
+            {'name': name, 'schema': {'fields': [{'name': 'x', 'type': 'boolean'}]}}
+            for name in ('a', 'b')
+        ]
+    }
+    book, server = get_fake_book()
+    tablecloth.gsheets.write_template(package, book=book)
+    assert [
+        len(request['body']['requests'])
+        for request in server.requests
+        if 'addSheet' in request['body'].get('requests', [{}])[0]
+    ] == [2]
+    assert [sheet.title for sheet in book.worksheets()] == ['a', 'b']
+
+
+def test_adds_sheets_with_the_default_size_of_add_worksheet() -> None:
+    """It adds sheets with 100 rows and 26 columns, like book.add_worksheet."""
+    package = {
+        'resources': [
+            {
+                'name': 'table',
+                'schema': {'fields': [{'name': 'x', 'constraints': {'enum': [1]}}]},
+            }
+        ]
+    }
+    book, server = get_fake_book()
+    tablecloth.gsheets.write_template(package, book=book)
+    assert [
+        (x['properties']['title'], x['properties']['gridProperties'])
+        for x in server.sheet_requests('addSheet')
+    ] == [
+        ('table', {'rowCount': 100, 'columnCount': 26}),
+        ('lists', {'rowCount': 100, 'columnCount': 26}),
+    ]
+
+
+def test_sizes_sheets_to_fit_their_content() -> None:
+    """It adds sheets with enough columns for the table and rows for each enum."""
+    package = {
+        'resources': [
+            {
+                'name': 'table',
+                'schema': {
+                    'fields': [
+                        {
+                            'name': f'x{i}',
+                            'constraints': {'enum': list(range(i, i + 150))},
+                        }
+                        for i in range(30)
+                    ]
+                },
+            }
+        ]
+    }
+    book, server = get_fake_book()
+    tablecloth.gsheets.write_template(package, book=book)
+    assert [
+        (x['properties']['title'], x['properties']['gridProperties'])
+        for x in server.sheet_requests('addSheet')
+    ] == [
+        ('table', {'rowCount': 100, 'columnCount': 30}),
+        ('lists', {'rowCount': 150, 'columnCount': 30}),
+    ]
+
+
+def test_writes_enums_and_header_with_the_same_parse_mode() -> None:
+    """It writes enum values as if typed by the user, like the header."""
+    package = {
+        'resources': [
+            {
+                'name': 'table',
+                'schema': {
+                    'fields': [{'name': 'x', 'constraints': {'enum': [1, 'TRUE']}}]
+                },
+            }
+        ]
+    }
+    book, server = get_fake_book()
+    tablecloth.gsheets.write_template(package, book=book)
+    header = next(
+        x for x in server.requests if "'table'!A1" in urllib.parse.unquote(x['uri'])
+    )
+    assert 'valueInputOption=USER_ENTERED' in header['uri']
+    enums = next(x for x in server.requests if 'batchUpdateByDataFilter' in x['uri'])
+    assert enums['body']['valueInputOption'] == 'USER_ENTERED'
+    assert enums['body']['data'][0]['values'] == [[1, 'TRUE']]
@@ -25,6 +25,16 @@ def test_converts_camel_to_snake_case(input: str, expected: str) -> None:
     assert tablecloth.helpers.camel_to_snake_case(input) == expected
 
 
+def test_converts_equal_dictionaries_to_equal_hashable_tuples() -> None:
+    """It converts dictionaries to hashable tuples, regardless of key order."""
+    a = {'enum': ['x', 'y'], 'minLength': 1, 'nested': {'b': [1], 'a': None}}
+    b = {'nested': {'a': None, 'b': [1]}, 'minLength': 1, 'enum': ['x', 'y']}
+    assert len({tablecloth.helpers.to_hashable(x) for x in (a, b)}) == 1
+    # List order is preserved
+    c = {**a, 'enum': ['y', 'x']}
+    assert tablecloth.helpers.to_hashable(a) != tablecloth.helpers.to_hashable(c)
+
+
 @pytest.mark.parametrize(
     'input, expected',
     [(None, []), ('', []), ('x', ['x']), (['x'], ['x']), (['x', 'y'], ['x', 'y'])],
@@ -43,6 +53,8 @@ def test_converts_singleton_string_to_list(
         (1, 'B'),
         (26, 'AA'),
         (28, 'AC'),
+        (701, 'ZZ'),
+        (702, 'AAA'),
         (16383, 'XFD'),
     ],
 )
@@ -275,6 +287,50 @@ def test_joins_strings_into_a_human_readable_list(
     assert tablecloth.helpers.readable_join(input) == expected
 
 
+@pytest.mark.parametrize(
+    'template, compiled',
+    [
+        *(
+            (value, tablecloth.constants.COMPILED_TYPES[key])
+            for key, value in tablecloth.constants.TYPES.items()
+        ),
+        *(
+            (value, tablecloth.constants.COMPILED_CONSTRAINTS[key])
+            for key, value in tablecloth.constants.CONSTRAINTS.items()
+        ),
+        (tablecloth.constants.IN_RANGE, tablecloth.constants.COMPILED_IN_RANGE),
+    ],
+)
+def test_renders_compiled_template_like_format(
+    template: tablecloth.constants.CheckTemplate,
+    compiled: tablecloth.constants.CompiledCheckTemplate,
+) -> None:
+    """It renders a pre-parsed template identically to formatting the original."""
+    kwargs = {
+        'col': 'B',
+        'row': 2,
+        'value': '[a-z]{2}',
+        'min_col': 'A',
+        'max_col': 'C',
+        'max_row': '$10',
+        'ncols': 3,
+        'range': "'lists'!$A$1:$A$2",
+    }
+    render = tablecloth.helpers.render_template
+    assert render(compiled['valid'], **kwargs) == template['valid'].format(**kwargs)
+    assert render(compiled['invalid'], **kwargs) == template['invalid'].format(**kwargs)
+    assert render(compiled['message'], **kwargs) == template['message'].format(**kwargs)
+
+
+@pytest.mark.parametrize(
+    'template', ['{x!r}', '{x:>5}', '{0}', '{}', '{x.y}', '{x[0]}']
+)
+def test_refuses_to_compile_unsupported_template_fields(template: str) -> None:
+    """It refuses to pre-parse fields that rendering would not format the same."""
+    with pytest.raises(ValueError):
+        tablecloth.constants.compile_template(template)
+
+
 @pytest.mark.parametrize(
     'input, expected',
     [
@@ -37,6 +37,18 @@ def test_gets_a_column_range() -> None:
     assert layout.get_column_range('a', 'x', fixed=True) == '$A$2:$A$10'
 
 
+def test_gets_all_column_codes_and_ranges_of_a_table() -> None:
+    """It gets the codes and ranges of all columns of a table at once."""
+    layout = Layout(max_rows=10)
+    layout.set_table('a', ['x', 'y'])
+    assert layout.get_column_codes('a') == {'x': 'A', 'y': 'B'}
+    assert layout.get_column_ranges('a') == {'x': 'A2:A10', 'y': 'B2:B10'}
+    for column in ('x', 'y'):
+        assert layout.get_column_ranges('a', absolute=True, fixed=True)[
+            column
+        ] == layout.get_column_range('a', column, absolute=True, fixed=True)
+
+
 def test_gets_an_enum_range() -> None:
     """It gets an enum range."""
     layout = Layout()